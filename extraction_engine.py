@@ -1,12 +1,18 @@
 
 import zipfile
 import re
+import os
+import bisect
 from pathlib import Path
 import orjson
 import sys
 import shutil
 import datetime
 import uuid
+import hashlib
+import subprocess
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial, lru_cache
 
 """
 extraction_engine.py
@@ -17,7 +23,38 @@ Always outputs JSON files to the 'TargetDataStore' directory.
 ---------------------------------------------
 """
 
-# Helper: classify layer by file path or package
+# Output JSON is machine-consumed, so it is written compact; set KYC_PRETTY_JSON=1 to indent it for debugging
+JSON_OPTIONS = orjson.OPT_APPEND_NEWLINE | (orjson.OPT_INDENT_2 if os.environ.get("KYC_PRETTY_JSON") == "1" else 0)
+
+# Java sources are stored once under TargetDataStore/_sources/<hash>.java; attributes refer to them by hash.
+# In index.json they sit alongside the attribute names, so the key must not be a legal Java identifier
+SOURCES_DIR = "_sources"
+SOURCES_KEY = "#sources"
+# Larger "Java" files are generated or binary; they are skipped rather than loaded into memory
+MAX_JAVA_BYTES = 2 * 1024 * 1024
+
+# Precompiled patterns used by extract_attributes_from_java
+CLASS_RE = re.compile(r'class\s+(\w+)')
+FIELD_RE = re.compile(r'\s*(private|protected|public)\s+([\w<>]+)\s+([\w_]+)\s*;')
+ANN_RE = re.compile(r'@([\w]+)')
+JAVADOC_RE = re.compile(r'/\*\*(.*?)\*/')
+COMMENT_RE = re.compile(r'//(.*)')
+COL_RE = re.compile(r'@Column\s*\(.*name\s*=\s*"([^"]+)"')
+TABLE_RE = re.compile(r'@Table\s*\(.*name\s*=\s*"([^"]+)"')
+ALIAS_COMMENT_RE = re.compile(r'//\s*alias\s*:?\s*([\w_]+)', re.IGNORECASE)
+SQL_RE = re.compile(r'(select|update|delete|insert)\s', re.IGNORECASE)
+# ORM/REST/external-call patterns run once per file in build_project_corpus. They are kept as
+# separate literal-prefixed scans: a single combined alternation is ~3x slower in the re engine.
+ORM_RE = re.compile(r'@(Entity|Table|Column|Id|JoinColumn|ManyToOne|OneToMany)')
+REST_RE = re.compile(r'@(GetMapping|PostMapping|PutMapping|DeleteMapping|RequestMapping|ApiOperation)')
+EXTCALL_RE = re.compile(r'(httpClient|restTemplate|WebClient)\.(get|post|put|delete)')
+# Literals at least one of which must be present for the pattern above to match
+EXTCALL_CLIENTS = ("httpClient", "restTemplate", "WebClient")
+SQL_KEYWORDS = ("select", "update", "delete", "insert")
+NEWLINE_RE = re.compile(r'\n')
+
+# Helper: classify layer by file path or package (memoized: the same paths are classified repeatedly)
+@lru_cache(maxsize=4096)
 def classify_layer(path_or_package):
     s = str(path_or_package).lower()
     if any(x in s for x in ["model", "entity", "domain"]):
@@ -32,79 +69,173 @@ def classify_layer(path_or_package):
         return "UI"
     return "DEFAULT"
 
-def extract_attributes_from_java(java_path, batch_id):
+# Helper: content hash that attributes use to refer to their class source
+def source_ref(full_source):
+    return hashlib.blake2b(full_source.encode("utf-8"), digest_size=16).hexdigest()
+
+# Helpers: collect components/edges, deduplicating as they are added
+def _add_component(components, unique_components, comp):
+    components.append(comp)
+    unique_components.setdefault((comp.get("className"), comp.get("type"), comp.get("filePath")), comp)
+
+def _add_edge(dep_edges, edge):
+    dep_edges.setdefault((edge.get("from"), edge.get("to"), edge.get("type"), edge.get("layer")), edge)
+
+# Helper: recursive os.scandir walk yielding the DirEntry of every file ending in one of exts
+def _scandir_ext(root, exts):
+    try:
+        with os.scandir(root) as it:
+            entries = list(it)
+    except PermissionError:
+        return
+    subdirs = []
+    for entry in entries:
+        if entry.is_symlink():
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            subdirs.append(entry.path)
+        elif entry.name.endswith(exts):
+            yield entry
+    for subdir in subdirs:
+        yield from _scandir_ext(subdir, exts)
+
+def build_project_corpus(root):
+    """
+    Walks the extracted project once and returns the cached Java files shared by every
+    extract_attributes_from_java call: {"java": [file entries], "byPath": {path: file entry},
+    "byRoot": {project root: [file entries]}}.
+    """
+    # Read each project file once; the per-field scans work on these cached entries
+    java_files = []
+    for entry in _scandir_ext(root, (".java",)):
+        size = entry.stat().st_size
+        if size > MAX_JAVA_BYTES:
+            print(f"[WARN] Skipping {entry.path}: {size} bytes exceeds {MAX_JAVA_BYTES}")
+            continue
+        jfile = Path(entry.path)
+        # Decoded eagerly (not mmap'd): every file is scanned for field references, split into
+        # lines on a hit, and the corpus has to be picklable for the worker processes
+        jcontent = jfile.read_text(encoding="utf-8", errors="replace")
+        class_match_j = CLASS_RE.search(jcontent)
+        # Cheap substring checks first; most files have no annotations, clients or SQL at all
+        has_annots = "@" in jcontent
+        lowered = jcontent.lower()
+        java_files.append({
+            "path": jfile,
+            "content": jcontent,
+            "lines": None,  # split lazily on the first reference hit
+            "newlines": None,  # sorted '\n' offsets, built alongside lines
+            "className": class_match_j.group(1) if class_match_j else jfile.stem,
+            "layer": classify_layer(jfile),
+            "orm": ORM_RE.findall(jcontent) if has_annots else [],
+            "rest": REST_RE.findall(jcontent) if has_annots else [],
+            "external": EXTCALL_RE.findall(jcontent) if any(k in jcontent for k in EXTCALL_CLIENTS) else [],
+            "maySql": any(k in lowered for k in SQL_KEYWORDS)
+        })
+    # Group the entries once under every project root (a Java file's parent.parent) that contains
+    # them, so each file's project lookup is a dict hit instead of a scan of the whole corpus
+    by_root = {pf["path"].parent.parent: [] for pf in java_files}
+    for pf in java_files:
+        for parent in pf["path"].parents:
+            if parent in by_root:
+                by_root[parent].append(pf)
+    return {"java": java_files, "byPath": {pf["path"]: pf for pf in java_files}, "byRoot": by_root}
+
+# Helper: repo revision (git hash) of the extracted project, if available. Files of one project
+# share a folder, so git is spawned once per distinct folder (per worker) rather than per field
+@lru_cache(maxsize=None)
+def get_repo_revision(path):
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=path, encoding="utf-8", stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "N/A"
+
+def extract_attributes_from_java(java_path, batch_id, corpus):
     """
     Returns a list of attribute dicts matching the required format, one per field found in the Java file.
+    corpus is the shared file cache from build_project_corpus.
     """
     attribute_dicts = []
-    # Read the Java file
-    full_source = java_path.read_text(encoding="utf-8")
+    # The file's corpus entry already holds its decoded source and class name
+    entry = corpus["byPath"].get(java_path)
+    if entry is not None:
+        full_source = entry["content"]
+        class_name = entry["className"]
+    else:
+        full_source = java_path.read_text(encoding="utf-8", errors="replace")
+        class_match = CLASS_RE.search(full_source)
+        class_name = class_match.group(1) if class_match else java_path.stem
     lines = full_source.splitlines()
-    # Extract class name
-    class_match = re.search(r'class\s+(\w+)', full_source)
-    class_name = class_match.group(1) if class_match else java_path.stem
-    # Extract fields: (visibility, type, name)
+    # Every attribute of the class refers to the same stored source
+    src_ref = source_ref(full_source)
+    # Extract fields: (line number, declaration line, visibility, type, name)
     fields = []
     for i, line in enumerate(lines):
-        field_match = re.match(r'\s*(private|protected|public)\s+([\w<>]+)\s+([\w_]+)\s*;', line)
+        field_match = FIELD_RE.match(line)
         if field_match:
-            fields.append((field_match.group(1), field_match.group(2), field_match.group(3)))
-    # Find all Java and HTML files in the project
-    all_java_files = list(java_path.parent.parent.rglob("*.java"))
-    all_html_files = list(java_path.parent.parent.rglob("*.html"))
+            fields.append((i + 1, line.strip(), field_match.group(1), field_match.group(2), field_match.group(3)))
+    # Restrict the shared corpus to the files under this file's project folder
+    project_root = java_path.parent.parent
+    project_files = corpus["byRoot"].get(project_root)
+    if project_files is None:
+        project_files = [pf for pf in corpus["java"] if pf["path"].is_relative_to(project_root)]
+    # Scan each project file once for all field names together and bucket the hits per field
+    ref_hits = {field[4]: [] for field in fields}
+    if ref_hits:
+        names = sorted(ref_hits, key=len, reverse=True)
+        refs_re = re.compile(r'\b(' + '|'.join(re.escape(name) for name in names) + r')\b')
+        for pf in project_files:
+            for m in refs_re.finditer(pf["content"]):
+                ref_hits[m.group(1)].append((pf, m.start()))
     for idx, field in enumerate(fields):
-        visibility, field_type, field_name = field
-        line_num = None
-        snippet = ""
-        for i, line in enumerate(lines):
-            if re.search(rf'{visibility}\s+{re.escape(field_type)}\s+{re.escape(field_name)}\s*;', line):
-                line_num = i + 1
-                snippet = line.strip()
-                break
+        line_num, snippet, visibility, field_type, field_name = field
+        assign_re = re.compile(rf'{field_name}\s*[:=]\s*([\w_]+)')
         annotations = []
         doc_comments = []
-        if line_num is not None:
-            # Parse annotations
-            for j in range(line_num-2, max(line_num-6, -1), -1):
-                if j >= 0:
-                    ann_match = re.match(r'@([\w]+)', lines[j].strip())
+        # Single reverse sweep over the lines above the field: annotations within 4 lines,
+        # Javadoc/line comments within 8; anything not starting with '@' or '/' is skipped
+        for j in range(line_num-2, max(line_num-10, -1), -1):
+            stripped = lines[j].strip()
+            if not stripped:
+                continue
+            if stripped[0] == "@":
+                if j >= line_num-5:
+                    ann_match = ANN_RE.match(stripped)
                     if ann_match:
                         annotations.append(ann_match.group(1))
-            # Parse Javadoc/comments above field
-            for j in range(line_num-2, max(line_num-10, -1), -1):
-                if j >= 0:
-                    doc_match = re.match(r'/\*\*(.*?)\*/', lines[j].strip())
-                    if doc_match:
-                        doc_comments.append(doc_match.group(1))
-                    comment_match = re.match(r'//(.*)', lines[j].strip())
-                    if comment_match:
-                        doc_comments.append(comment_match.group(1))
+            elif stripped[0] == "/":
+                doc_match = JAVADOC_RE.match(stripped)
+                if doc_match:
+                    doc_comments.append(doc_match.group(1))
+                comment_match = COMMENT_RE.match(stripped)
+                if comment_match:
+                    doc_comments.append(comment_match.group(1))
         # Aliases extraction: look for alternative names in annotations, comments, and code
         aliases = set()
-        for j in range(line_num-6, line_num+2):
-            if 0 <= j < len(lines):
-                col_match = re.search(r'@Column\s*\(.*name\s*=\s*"([^"]+)"', lines[j])
+        for j in range(max(0, line_num-6), min(len(lines), line_num+2)):
+            line = lines[j]
+            if "@" in line:
+                col_match = COL_RE.search(line)
                 if col_match:
                     aliases.add(col_match.group(1))
-                table_match = re.search(r'@Table\s*\(.*name\s*=\s*"([^"]+)"', lines[j])
+                table_match = TABLE_RE.search(line)
                 if table_match:
                     aliases.add(table_match.group(1))
-        for j in range(line_num-6, line_num+2):
-            if 0 <= j < len(lines):
-                comment_match = re.search(r'//\s*alias\s*:?\s*([\w_]+)', lines[j], re.IGNORECASE)
+            if "//" in line:
+                comment_match = ALIAS_COMMENT_RE.search(line)
                 if comment_match:
                     aliases.add(comment_match.group(1))
         for j in range(max(0, line_num-10), min(len(lines), line_num+10)):
-            if re.search(rf'{field_name}\s*[:=]\s*([\w_]+)', lines[j]):
-                alt_match = re.findall(rf'{field_name}\s*[:=]\s*([\w_]+)', lines[j])
-                for alt in alt_match:
-                    if alt != field_name:
-                        aliases.add(alt)
+            for alt in assign_re.findall(lines[j]):
+                if alt != field_name:
+                    aliases.add(alt)
 
+        # Every occurrence feeds the impact analysis; only the first per (className, type, filePath) is output
         components = []
+        unique_components = {}
         class_snippet = snippet
         explanation = f"Field {field_name} of type {field_type} in class {class_name}"
-        components.append({
+        _add_component(components, unique_components, {
             "type": classify_layer(java_path),
             "filePath": str(java_path),
             "className": class_name,
@@ -114,50 +245,39 @@ def extract_attributes_from_java(java_path, batch_id):
             "explanation": explanation
         })
         # Scan all Java files for references to the field
-        for jfile in all_java_files:
-            try:
-                jcontent = jfile.read_text(encoding="utf-8")
-                # ...existing code...
-                for m in re.finditer(rf'\b{re.escape(field_name)}\b', jcontent):
-                    lines_j = jcontent.splitlines()
-                    line_idx = jcontent[:m.start()].count('\n')
-                    context_line = lines_j[line_idx].strip() if line_idx < len(lines_j) else ''
-                    class_match_j = re.search(r'class\s+(\w+)', jcontent)
-                    class_name_j = class_match_j.group(1) if class_match_j else jfile.stem
-                    usage_type = "REFERENCE"
-                    layer = classify_layer(jfile)
-                    if jfile == java_path and context_line == class_snippet:
-                        continue
-                    # Detect SQL queries and ORM annotations
-                    sql_match = re.search(r'(select|update|delete|insert)\s', context_line, re.IGNORECASE)
-                    orm_annots = re.findall(r'@(Entity|Table|Column|Id|JoinColumn|ManyToOne|OneToMany)', jcontent)
-                    components.append({
-                        "type": layer,
-                        "filePath": str(jfile),
-                        "className": class_name_j,
-                        "usageType": usage_type,
-                        "snippet": context_line,
-                        "lineRange": line_idx+1,
-                        "explanation": f"Reference to {field_name} in class {class_name_j}",
-                        "sql": bool(sql_match),
-                        "orm": orm_annots
-                    })
-            except Exception:
+        for pf, start in ref_hits[field_name]:
+            jfile = pf["path"]
+            jcontent = pf["content"]
+            class_name_j = pf["className"]
+            if pf["lines"] is None:
+                pf["lines"] = jcontent.splitlines()
+                pf["newlines"] = [m.start() for m in NEWLINE_RE.finditer(jcontent)]
+            lines_j = pf["lines"]
+            line_idx = bisect.bisect_left(pf["newlines"], start)
+            context_line = lines_j[line_idx].strip() if line_idx < len(lines_j) else ''
+            usage_type = "REFERENCE"
+            if jfile == java_path and context_line == class_snippet:
                 continue
-        # Scan all HTML files for UI references
-        for hfile in all_html_files:
-            hcontent = hfile.read_text(encoding="utf-8")
-            # ...existing code...
+            # Detect SQL queries and ORM annotations
+            sql_match = SQL_RE.search(context_line) if pf["maySql"] else None
+            _add_component(components, unique_components, {
+                "type": pf["layer"],
+                "filePath": str(jfile),
+                "className": class_name_j,
+                "usageType": usage_type,
+                "snippet": context_line,
+                "lineRange": line_idx+1,
+                "explanation": f"Reference to {field_name} in class {class_name_j}",
+                "sql": bool(sql_match),
+                "orm": pf["orm"]
+            })
         # Scan for REST/API annotations and external calls
-        for jfile in all_java_files:
-            try:
-                jcontent = jfile.read_text(encoding="utf-8")
-            except Exception:
-                continue
-            rest_annots = re.findall(r'@(GetMapping|PostMapping|PutMapping|DeleteMapping|RequestMapping|ApiOperation)', jcontent)
-            external_calls = re.findall(r'(httpClient|restTemplate|WebClient)\.(get|post|put|delete)', jcontent)
+        for pf in project_files:
+            jfile = pf["path"]
+            rest_annots = pf["rest"]
+            external_calls = pf["external"]
             if rest_annots:
-                components.append({
+                _add_component(components, unique_components, {
                     "type": "CONTROLLER",
                     "filePath": str(jfile),
                     "className": jfile.stem,
@@ -167,7 +287,7 @@ def extract_attributes_from_java(java_path, batch_id):
                     "explanation": f"REST API annotation(s) in {jfile.name}"
                 })
             if external_calls:
-                components.append({
+                _add_component(components, unique_components, {
                     "type": "INTEGRATION",
                     "filePath": str(jfile),
                     "className": jfile.stem,
@@ -178,7 +298,7 @@ def extract_attributes_from_java(java_path, batch_id):
                 })
         # Build rich dependency graph
         dep_nodes = set()
-        dep_edges = []
+        dep_edges = {}
         # Add main class and field as nodes
         dep_nodes.add(class_name)
         dep_nodes.add(field_name)
@@ -188,7 +308,7 @@ def extract_attributes_from_java(java_path, batch_id):
             dep_nodes.add(comp.get("filePath", ""))
             # Edge: declaration
             if comp["type"] == "MODEL" and comp["usageType"] in ["private", "protected", "public"]:
-                dep_edges.append({
+                _add_edge(dep_edges, {
                     "from": comp["className"],
                     "to": field_name,
                     "type": "declaration",
@@ -196,7 +316,7 @@ def extract_attributes_from_java(java_path, batch_id):
                 })
             # Edge: repository query
             if comp["type"] == "REPOSITORY":
-                dep_edges.append({
+                _add_edge(dep_edges, {
                     "from": comp["className"],
                     "to": field_name,
                     "type": "queries",
@@ -204,7 +324,7 @@ def extract_attributes_from_java(java_path, batch_id):
                 })
             # Edge: service call
             if comp["type"] == "SERVICE":
-                dep_edges.append({
+                _add_edge(dep_edges, {
                     "from": comp["className"],
                     "to": field_name,
                     "type": "calls",
@@ -212,7 +332,7 @@ def extract_attributes_from_java(java_path, batch_id):
                 })
             # Edge: controller bind/write
             if comp["type"] == "CONTROLLER":
-                dep_edges.append({
+                _add_edge(dep_edges, {
                     "from": comp["className"],
                     "to": field_name,
                     "type": "binds",
@@ -220,7 +340,7 @@ def extract_attributes_from_java(java_path, batch_id):
                 })
             # Edge: UI bind
             if comp["type"] == "UI":
-                dep_edges.append({
+                _add_edge(dep_edges, {
                     "from": comp["className"],
                     "to": field_name,
                     "type": "ui-binds",
@@ -228,7 +348,7 @@ def extract_attributes_from_java(java_path, batch_id):
                 })
             # Edge: generic reference
             if comp["usageType"] in ["REFERENCE", "UI_REFERENCE"]:
-                dep_edges.append({
+                _add_edge(dep_edges, {
                     "from": comp["className"],
                     "to": field_name,
                     "type": "refers",
@@ -380,44 +500,21 @@ def extract_attributes_from_java(java_path, batch_id):
             "extra": extra
         }
         # Meta information enhancement
-        # Try to get repo revision (git hash) if available
-        repo_revision = None
-        try:
-            import subprocess
-            repo_revision = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=java_path.parent.parent, encoding="utf-8", stderr=subprocess.DEVNULL).strip()
-        except Exception:
-            repo_revision = "N/A"
         meta = {
             "source": str(java_path),
             "type": field_type,
             "dependency": None,
             "annotations": annotations,
-            "repoRevision": repo_revision,
+            "repoRevision": get_repo_revision(java_path.parent.parent),
             "timestamp": datetime.datetime.now().isoformat()
         }
-        # Remove duplicate components (use only className, type, filePath for uniqueness)
-        seen = set()
-        unique_components = []
-        for comp in components:
-            key = (comp.get("className"), comp.get("type"), comp.get("filePath"))
-            if key not in seen:
-                seen.add(key)
-                unique_components.append(comp)
-        # Remove duplicate dependency edges
-        seen_edges = set()
-        unique_edges = []
-        for edge in dep_edges:
-            key = (edge.get("from"), edge.get("to"), edge.get("type"), edge.get("layer"))
-            if key not in seen_edges:
-                seen_edges.add(key)
-                unique_edges.append(edge)
         attr_dict = {
             "attributeName": field_name,
             "aliases": list(aliases) if aliases else [],
-            "components": unique_components,
+            "components": list(unique_components.values()),
             "dependencies": {
                 "nodes": list(dep_nodes),
-                "edges": unique_edges
+                "edges": list(dep_edges.values())
             },
             "impact": impact,
             "processDiff": process_diff,
@@ -425,46 +522,106 @@ def extract_attributes_from_java(java_path, batch_id):
             "explanation": explanation,
             "Batch_ID": batch_id,
             "created_at": datetime.datetime.now().isoformat(),
-            "fullSource": full_source
+            "fullSourceRef": src_ref
         }
         attribute_dicts.append(attr_dict)
     return attribute_dicts
 
+# Helper: reject ZIP members that could escape the extraction folder
+def _is_safe_member(name):
+    safe_member = "".join(c for c in name if c.isalnum() or c in "_-./")
+    return not (".." in safe_member or safe_member.startswith("/"))
+
+# Helper: write a whole buffer to path with raw os calls (runs on the I/O thread pool)
+def _write_bytes(path, buf):
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(buf)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+# Helper: queue one JSON file write per extracted attribute
+def _write_attributes(attribute_dicts, java_file: Path, output_dir: Path, io_pool, pending):
+    for attr in attribute_dicts:
+        # If this is a top-level class (no fields), ensure all top-level keys are present
+        if 'attributeName' not in attr:
+            # Patch: set attributeName to className if missing
+            if 'components' in attr and attr['components'] and 'className' in attr['components'][0]:
+                attr['attributeName'] = attr['components'][0]['className']
+            else:
+                attr['attributeName'] = java_file.stem
+            # Patch: add empty meta, explanation, dependencies if missing
+            attr.setdefault('meta', {'type': attr['attributeName'], 'source': str(java_file), 'annotations': [], 'dependency': None})
+            attr.setdefault('explanation', f"• '{attr['attributeName']}' is a top-level class.")
+            attr.setdefault('dependencies', {'nodes': [attr['attributeName']], 'edges': []})
+        out_file = output_dir / f"{attr['attributeName']}.json"
+        buf = orjson.dumps(attr, option=JSON_OPTIONS)
+        # Attributes with the same name share a file (case-insensitively on some filesystems); let the
+        # earlier write finish so the last one still wins
+        key = os.path.normcase(str(out_file)).lower()
+        if key in pending:
+            pending[key].result()
+        pending[key] = io_pool.submit(_write_bytes, out_file, buf)
+
+
+# Worker-process side of scan_java_project: the corpus is shipped once per worker, not per task
+_worker_corpus = None
+
+def _init_worker(corpus):
+    global _worker_corpus
+    _worker_corpus = corpus
+
+def _extract_in_worker(java_path, batch_id):
+    return extract_attributes_from_java(java_path, batch_id, _worker_corpus)
+
 def scan_java_project(imports_folder: Path, output_dir: Path, batch_id: str):
+    """
+    Writes one JSON file per attribute and returns (attributes, sources): every attribute dict in
+    write order, and the stored class sources keyed by fullSourceRef.
+    """
     output_dir.mkdir(parents=True, exist_ok=True)
-    for java_file in imports_folder.rglob("*.java"):
-        attribute_dicts = extract_attributes_from_java(java_file, batch_id)
-        for attr in attribute_dicts:
-            # If this is a top-level class (no fields), ensure all top-level keys are present
-            if 'attributeName' not in attr:
-                # Patch: set attributeName to className if missing
-                if 'components' in attr and attr['components'] and 'className' in attr['components'][0]:
-                    attr['attributeName'] = attr['components'][0]['className']
-                else:
-                    attr['attributeName'] = java_file.stem
-                # Patch: add empty meta, explanation, dependencies if missing
-                attr.setdefault('meta', {'type': attr['attributeName'], 'source': str(java_file), 'annotations': [], 'dependency': None})
-                attr.setdefault('explanation', f"• '{attr['attributeName']}' is a top-level class.")
-                attr.setdefault('dependencies', {'nodes': [attr['attributeName']], 'edges': []})
-            out_file = output_dir / f"{attr['attributeName']}.json"
-            with open(out_file, "wb") as f:
-                f.write(orjson.dumps(attr, option=orjson.OPT_INDENT_2))
+    corpus = build_project_corpus(imports_folder)
+    java_files = [pf["path"] for pf in corpus["java"]]
+    sources_dir = output_dir / SOURCES_DIR
+    sources_dir.mkdir(exist_ok=True)
+    source_text = {pf["path"]: pf["content"] for pf in corpus["java"]}
+    all_attrs = []
+    sources = {}
+    # Files are independent and the extraction is CPU-bound, so fan out across processes.
+    # map() yields results in input order, so the JSON files are written in the same order as before.
+    # JSON writes go to a small thread pool so they overlap with the extraction still running
+    pending = {}
+    with ProcessPoolExecutor(initializer=_init_worker, initargs=(corpus,)) as ex, ThreadPoolExecutor(max_workers=4) as io_pool:
+        results = ex.map(partial(_extract_in_worker, batch_id=batch_id), java_files, chunksize=8)
+        for java_file, attribute_dicts in zip(java_files, results):
+            _write_attributes(attribute_dicts, java_file, output_dir, io_pool, pending)
+            all_attrs.extend(attribute_dicts)
+            # Every attribute of a class shares one stored copy of its source
+            refs = {attr["fullSourceRef"] for attr in attribute_dicts if "fullSourceRef" in attr}
+            for ref in refs:
+                if ref not in sources:
+                    sources[ref] = source_text[java_file]
+                    src_file = sources_dir / f"{ref}.java"
+                    pending[src_file] = io_pool.submit(_write_bytes, src_file, sources[ref].encode("utf-8"))
+        # Surface any write error before index.json is built from these files
+        for fut in pending.values():
+            fut.result()
+    return all_attrs, sources
 
 
-def generate_index_json(output_dir: Path):
-    # Aggregate all JSON files in output_dir into index.json
-    index = {}
-    for json_file in output_dir.glob("*.json"):
-        try:
-            with open(json_file, "rb") as f:
-                data = orjson.loads(f.read())
-            key = data.get("attributeName") or json_file.stem
-            index[key] = data
-        except Exception:
-            continue
+def generate_index_json(output_dir: Path, all_attrs, sources):
+    # Aggregate the attributes written by scan_java_project into index.json; like the
+    # per-attribute files, a later attribute with the same name replaces an earlier one
+    index = {attr["attributeName"]: attr for attr in all_attrs}
+    # Class sources referenced by the surviving attributes, each included once
+    used_sources = {attr["fullSourceRef"]: sources[attr["fullSourceRef"]] for attr in index.values() if "fullSourceRef" in attr}
+    if used_sources:
+        index[SOURCES_KEY] = used_sources
     out_file = output_dir / "index.json"
     with open(out_file, "wb") as f:
-        f.write(orjson.dumps(index, option=orjson.OPT_INDENT_2))
+        f.write(orjson.dumps(index, option=JSON_OPTIONS))
 
 def main():
     # Automatically process all ZIP files in SourceDataStore folder
@@ -475,17 +632,16 @@ def main():
     temp_extract = output_dir / "_extracted"
     # Remove all data in TargetDataStore before starting extraction
     if output_dir.exists():
-        for item in output_dir.iterdir():
-            if item.is_file():
-                item.unlink()
-            elif item.is_dir():
-                shutil.rmtree(item)
+        shutil.rmtree(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
     zip_files = list(src_dir.glob("*.zip"))
     if not zip_files:
         print("No ZIP files found in SourceDataStore folder.")
         sys.exit(1)
     # Make a static copy of the list so moved files are not retried
     batch_counter = 1
+    all_attrs = []
+    all_sources = {}
     for zip_path in zip_files[:]:
         print(f"Processing: {zip_path}")
         batch_id = f"BATCH_{batch_counter}"
@@ -494,12 +650,11 @@ def main():
             shutil.rmtree(temp_extract)
         temp_extract.mkdir(parents=True, exist_ok=True)
         with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            for member in zip_ref.namelist():
-                safe_member = "".join(c for c in member if c.isalnum() or c in "_-./")
-                if ".." in safe_member or safe_member.startswith("/"):
-                    continue
-                zip_ref.extract(member, temp_extract)
-        scan_java_project(temp_extract, output_dir, batch_id)
+            safe_members = [m for m in zip_ref.infolist() if _is_safe_member(m.filename)]
+            zip_ref.extractall(temp_extract, members=safe_members)
+        attrs, sources = scan_java_project(temp_extract, output_dir, batch_id)
+        all_attrs.extend(attrs)
+        all_sources.update(sources)
         print(f"Extraction complete for {zip_path}. JSON files in: {output_dir}")
         # Validate JSON files were created and are non-empty
         json_files = list(output_dir.glob("*.json"))
@@ -516,7 +671,7 @@ def main():
         else:
             print(f"No valid JSON files created for {zip_path}. ZIP not moved.")
     # After all extraction, generate index.json
-    generate_index_json(output_dir)
+    generate_index_json(output_dir, all_attrs, all_sources)
 
 if __name__ == "__main__":
     main()
@@ -15,12 +15,11 @@ def generate_lightweight_local_html():
         print(f"Error: {html_file} not found")
         return
     
-    # Read the HTML content
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
+    # Read the HTML content as raw bytes; the edit below only looks for ASCII markers
+    html_content = html_file.read_bytes()
     
     # Create a more sophisticated load function that works offline
-    new_load_function = """async function loadAttributes() {
+    new_load_function = b"""async function loadAttributes() {
     try {
         console.log('[DEBUG] Attempting to load attributes...');
         let indexData;
@@ -51,8 +50,8 @@ def generate_lightweight_local_html():
         }"""
     
     # Find and replace the loadAttributes function
-    start_marker = "async function loadAttributes() {"
-    end_marker = "console.log('[DEBUG] Parsed index.json:', indexData);"
+    start_marker = b"async function loadAttributes() {"
+    end_marker = b"console.log('[DEBUG] Parsed index.json:', indexData);"
     
     start_pos = html_content.find(start_marker)
     if start_pos == -1:
@@ -67,19 +66,18 @@ def generate_lightweight_local_html():
     # Keep the rest of the function intact
     end_pos = end_pos + len(end_marker)
     
-    # Replace the function
-    new_html = (html_content[:start_pos] + 
-                new_load_function + 
-                "\n        console.log('[DEBUG] Parsed index.json:', indexData);" + 
-                html_content[end_pos:])
-    
-    # Write the new HTML file
+    # Write the new HTML file piece by piece, replacing the function without
+    # building a second full copy of the HTML in memory
     output_file = Path("home_flexible.html")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(new_html)
+    html_view = memoryview(html_content)
+    with open(output_file, 'wb') as f:
+        f.write(html_view[:start_pos])
+        f.write(new_load_function)
+        f.write(b"\n        console.log('[DEBUG] Parsed index.json:', indexData);")
+        f.write(html_view[end_pos:])
     
     print(f"✅ Generated {output_file}")
-    print(f"📁 File size: {len(new_html) / 1024:.1f} KB")
+    print(f"📁 File size: {output_file.stat().st_size / 1024:.1f} KB")
     print(f"🔧 This version provides helpful error messages and works with both approaches.")
 
 if __name__ == "__main__":
@@ -4,11 +4,77 @@ Generate a local HTML file that embeds the JSON data directly
 This allows the HTML to work without needing a web server
 """
 
-import json
+import base64
+import gzip
+import mmap
 import os
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import orjson
 
-def generate_local_html():
+# home.html marks the start of its loadAttributes function with this comment, and the
+# data-loading part of the function ends right before PARSED_MARKER
+LOAD_HOOK = b'// @@LOAD_ATTRIBUTES_HOOK@@'
+PARSED_MARKER = b"console.log('[DEBUG] Parsed index.json:', indexData);"
+# Fallback for templates without the hook: the same region located by the function's
+# structure, tolerant of whitespace drift, in one compiled pass
+_LOAD_RE = re.compile(rb"async\s+function\s+loadAttributes\s*\(\s*\)\s*\{\s*try\s*\{[\s\S]*?let\s+indexData;[\s\S]*?"
+                      rb"(?=console\.log\('\[DEBUG\] Parsed index\.json:')")
+# Start of the embedded script for each compress mode, to tell which one built a page
+EMBED_MARKERS = {True: b'window.EMBEDDED_INDEX_DATA_B64GZ = "', False: b'<script id="embedded-index"'}
+
+
+def precompute_template(html_bytes):
+    """
+    Find the two splice points of the template once: the </head> position and the
+    (start, end) of the data-loading part of loadAttributes (-1, -1 when absent).
+    """
+    head_close_pos = html_bytes.find(b'</head>')
+    load_start = html_bytes.find(LOAD_HOOK)
+    load_end = html_bytes.find(PARSED_MARKER, load_start) if load_start != -1 else -1
+    if load_end == -1:
+        load_match = _LOAD_RE.search(html_bytes)
+        load_start, load_end = load_match.span() if load_match else (-1, -1)
+    return head_close_pos, load_start, load_end
+
+
+def load_template_offsets(html_file, html_bytes):
+    """
+    precompute_template() results are kept in a small .home.html.cache sidecar keyed by
+    home.html's (st_mtime_ns, st_size), so later runs skip all pattern-finding; a key
+    mismatch, or offsets that no longer point at the expected markers, rebuilds it.
+    """
+    cache_file = html_file.with_name(f".{html_file.name}.cache")
+    stat = html_file.stat()
+    key = [stat.st_mtime_ns, stat.st_size]
+    if cache_file.exists():
+        try:
+            cached = orjson.loads(cache_file.read_bytes())
+            head_close_pos, load_start, load_end = cached["offsets"]
+            if (cached["key"] == key and html_bytes[head_close_pos:head_close_pos + 7] == b'</head>' and
+                    (load_end == -1 or html_bytes[load_end:load_end + len(PARSED_MARKER)] == PARSED_MARKER)):
+                return head_close_pos, load_start, load_end
+        except (orjson.JSONDecodeError, KeyError, ValueError, TypeError):
+            pass
+    offsets = precompute_template(html_bytes)
+    cache_file.write_bytes(orjson.dumps({"key": key, "offsets": offsets}))
+    return offsets
+
+def built_with_mode(output_file, compress):
+    """
+    Whether output_file embeds index.json the way compress asks for, judged by the
+    embedded script generate_local_html() inserts before </head>.
+    """
+    marker = EMBED_MARKERS[compress]
+    with open(output_file, 'rb') as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return False
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as page:
+            return page.find(marker) != -1
+
+def generate_local_html(compress=True, force=False):
     # Read the original HTML file
     html_file = Path("home.html")
     index_json_file = Path("TargetDataStore/index.json")
@@ -21,55 +87,80 @@ def generate_local_html():
         print(f"Error: {index_json_file} not found")
         return
     
-    # Read the HTML content
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html_content = f.read()
+    # Nothing to do if the output is newer than both inputs and this generator, and was
+    # built in the requested compress mode
+    output_file = Path("home_local.html")
+    if not force and output_file.exists() and output_file.stat().st_mtime_ns > max(
+            html_file.stat().st_mtime_ns, index_json_file.stat().st_mtime_ns, Path(__file__).stat().st_mtime_ns) \
+            and built_with_mode(output_file, compress):
+        print(f"✅ {output_file} is up to date")
+        return
     
-    # Read the JSON data
-    with open(index_json_file, 'r', encoding='utf-8') as f:
-        json_data = json.load(f)
+    if html_file.stat().st_size == 0:
+        print(f"Error: {html_file} is empty")
+        return
     
-    # Convert JSON to JavaScript variable
-    json_js = json.dumps(json_data, indent=2)
+    # Map home.html instead of reading it into memory
+    with ThreadPoolExecutor(1) as ex, open(html_file, 'rb') as html_fh, \
+            mmap.mmap(html_fh.fileno(), 0, access=mmap.ACCESS_READ) as html_content:
+        # Read index.json on a worker thread while home.html is scanned
+        json_fut = ex.submit(index_json_file.read_bytes)
+        head_close_pos, load_start, load_end = load_template_offsets(html_file, html_content)
+        json_bytes = json_fut.result()
+        # index.json comes from extraction_engine, so trust it and only sanity-check its
+        # shape (a full parse would build and discard the whole object tree)
+        if json_bytes[:64].lstrip()[:1] not in (b'{', b'[') or json_bytes[-64:].rstrip()[-1:] not in (b'}', b']'):
+            print(f"Error: {index_json_file} does not contain a JSON object or array")
+            return
+        # extraction_engine writes index.json compact unless KYC_PRETTY_JSON=1; indentation
+        # is dead weight in the page, so only an indented index is re-serialized
+        if json_bytes[1:2] == b'\n':
+            try:
+                json_bytes = orjson.dumps(orjson.loads(json_bytes))
+            except orjson.JSONDecodeError:
+                print(f"Error: {index_json_file} does not contain a JSON object or array")
+                return
     
-    # Create the embedded script
-    embedded_script = f"""
+        # Create the embedded script
+        if compress:
+            # gzip + base64 shrinks JSON text several times over; the page inflates it
+            # with DecompressionStream (see new_load_function below)
+            payload = base64.b64encode(gzip.compress(json_bytes, compresslevel=6, mtime=0))
+            embedded_script = (b"""
 <script>
-// Embedded JSON data for local usage
-window.EMBEDDED_INDEX_DATA = {json_js};
+// Embedded JSON data for local usage (gzip, base64-encoded)
+window.EMBEDDED_INDEX_DATA_B64GZ = \"""" + payload + b"""\";
 </script>
-"""
-    
-    # Find where to insert the script (before the closing </head> tag)
-    head_close_pos = html_content.find('</head>')
-    if head_close_pos == -1:
-        print("Error: Could not find </head> tag in HTML")
-        return
+""")
+        else:
+            # Escape "<" (only found inside JSON strings) so no "</script>" or "<!--" ends the block
+            json_bytes = json_bytes.replace(b'<', b'\\u003c')
+            embedded_script = (b"""
+<!-- Embedded JSON data for local usage -->
+<script id="embedded-index" type="application/json">""" + json_bytes + b"""</script>
+""")
     
-    # Insert the embedded script
-    new_html = html_content[:head_close_pos] + embedded_script + html_content[head_close_pos:]
+        # Insert the script before the (first) closing </head> tag
+        if head_close_pos == -1:
+            print("Error: Could not find </head> tag in HTML")
+            return
+        # Edits against the original HTML as (start, end, replacement)
+        edits = [(head_close_pos, head_close_pos, embedded_script)]
     
-    # Replace the loadAttributes function to use embedded data
-    old_load_function = """async function loadAttributes() {
-    try {
-    console.log('[DEBUG] Fetching /TargetDataStore/index.json...');
-    const indexResp = await fetch('TargetDataStore/index.json');
-    console.log('[DEBUG] index.json fetch status:', indexResp.status);
-    const indexText = await indexResp.text();
-    console.log('[DEBUG] index.json raw text:', indexText.slice(0, 500));
-        let indexData;
-        try {
-            indexData = JSON.parse(indexText);
-        } catch (jsonErr) {
-            console.error('[DEBUG] Failed to parse index.json:', jsonErr);
-            throw jsonErr;
-        }"""
-    
-    new_load_function = """async function loadAttributes() {
+        # Replace the data-loading start of loadAttributes to use embedded data
+        new_load_function = b"""async function loadAttributes() {
     try {
         console.log('[DEBUG] Using embedded JSON data...');
         let indexData;
-        if (window.EMBEDDED_INDEX_DATA) {
+        if (window.EMBEDDED_INDEX_DATA_B64GZ) {
+            const gzBytes = Uint8Array.from(atob(window.EMBEDDED_INDEX_DATA_B64GZ), c => c.charCodeAt(0));
+            const jsonStream = new Response(gzBytes).body.pipeThrough(new DecompressionStream('gzip'));
+            indexData = await new Response(jsonStream).json();
+            console.log('[DEBUG] Loaded compressed embedded data successfully');
+        } else if (document.getElementById('embedded-index')) {
+            indexData = JSON.parse(document.getElementById('embedded-index').textContent);
+            console.log('[DEBUG] Loaded embedded data successfully');
+        } else if (window.EMBEDDED_INDEX_DATA) {
             indexData = window.EMBEDDED_INDEX_DATA;
             console.log('[DEBUG] Loaded embedded data successfully');
         } else {
@@ -87,13 +178,35 @@ window.EMBEDDED_INDEX_DATA = {json_js};
             }
         }"""
     
-    # Replace the function
-    new_html = new_html.replace(old_load_function, new_load_function)
+        # Replace the function at the hook (or, failing that, the regex match) found above
+        if load_end == -1:
+            print(f"Warning: Could not find {LOAD_HOOK.decode()} in HTML; loadAttributes left unchanged")
+        else:
+            edits.append((load_start, load_end, LOAD_HOOK + b"\n" + new_load_function + b"\n        "))
     
-    # Write the new HTML file
-    output_file = Path("home_local.html")
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(new_html)
+        # Write the untouched HTML as memoryview slices between the edits
+        html_view = memoryview(html_content)
+        chunks = []
+        pos = 0
+        for start, end, replacement in sorted(edits):
+            chunks.append(html_view[pos:start])
+            chunks.append(replacement)
+            pos = end
+        chunks.append(html_view[pos:])
+        # Write to a sibling and swap it in only once complete: an interrupted write must
+        # not leave a truncated home_local.html whose mtime makes it look up to date
+        tmp_file = output_file.with_name(output_file.name + ".tmp")
+        try:
+            with open(tmp_file, 'wb', buffering=1 << 20) as f:
+                f.writelines(chunks)
+            os.replace(tmp_file, output_file)
+        finally:
+            tmp_file.unlink(missing_ok=True)
+            # The map cannot be closed while views into it are still alive; release them
+            # explicitly, since a traceback in flight may still reference the chunk list
+            for view in chunks[::2]:
+                view.release()
+            html_view.release()
     
     print(f"✅ Generated {output_file}")
     print(f"📁 File size: {os.path.getsize(output_file) / 1024 / 1024:.1f} MB")
@@ -101,4 +214,6 @@ window.EMBEDDED_INDEX_DATA = {json_js};
     print(f"💡 The file works locally without needing a web server.")
 
 if __name__ == "__main__":
-    generate_local_html()
\ No newline at end of file
+    # --no-gzip embeds plain JSON, for browsers without DecompressionStream; --force
+    # regenerates even if home_local.html looks up to date
+    generate_local_html(compress="--no-gzip" not in sys.argv[1:], force="--force" in sys.argv[1:])
\ No newline at end of file